@@ -10,20 +10,29 @@
 # - /api/import-start, /api/import, /api/import-progress (progresso de import)
 # -----------------------------------------------------------------------------
 
-from flask import Flask, request, jsonify, session, send_from_directory, Response
+from flask import Flask, g, request, jsonify, session, send_from_directory, Response
 from flask_cors import CORS
 from flask_compress import Compress
-from datetime import datetime
 from werkzeug.utils import secure_filename
+import numpy as np
+import orjson
+import base64
+import hashlib
+import logging
 import os
+import time
 import uuid
-from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from io import StringIO
 
 from auth import authenticate, get_current_user, logout_user
+from cache import cached, bump_data_version, data_version, progress_set, progress_get
 from data_loader import (
     load_users, query_metrics_sql, stream_export_csv, get_date_bounds,
     import_csv_file, METRICS_CSV, get_distinct_values, compute_totals
 )
+from utils import parse_data_query
 
 app = Flask(
     __name__,
@@ -33,23 +42,112 @@ app = Flask(
 CORS(app, supports_credentials=True)
 Compress(app)
 app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-key-change-me")
+# Rejeita uploads acima do limite antes de tocar o disco (413)
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_UPLOAD_MB", 2048)) * 1024 * 1024
 
-# -------- progresso em memória (simples) --------
-IMPORT_PROGRESS = {}
-IMPORT_LOCK = Lock()
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+logger = logging.getLogger("metrics.api")
+
+def with_etag(fn):
+    """ETag forte por (versão dos dados, rota+query) com resposta 304.
+
+    As rotas decoradas mudam só quando um CSV novo é importado; o bump de
+    DATA_VERSION troca a ETag e o navegador revalida com zero bytes de
+    payload no meio-tempo (If-None-Match -> 304, sem tocar o SQLite).
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        raw = f"v{data_version()}:{request.full_path}"
+        etag = f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            resp = Response(status=304)
+        else:
+            resp = app.make_response(fn(*args, **kwargs))
+        resp.headers["ETag"] = etag
+        resp.headers["Cache-Control"] = "private, max-age=60, must-revalidate"
+        resp.headers["Vary"] = "Cookie"
+        return resp
+    return wrapper
+
+def ojson(obj, status: int = 200) -> Response:
+    """Resposta JSON via orjson (serialização em C, 3-10x o json stdlib).
+
+    Usado nas rotas com payload grande (/api/data, /api/compare); as demais
+    continuam com jsonify, que é suficiente para respostas pequenas.
+    """
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+# -------- leituras quentes cacheadas (invalidadas pelo import) --------
+# Os resultados só mudam quando um novo CSV é importado; o decorator usa
+# DATA_VERSION no prefixo da chave, então bump_data_version() invalida tudo.
+
+_cached_date_bounds = cached(ttl=3600, key_fn=lambda: "date-range")(get_date_bounds)
+
+_cached_options = cached(
+    ttl=600,
+    key_fn=lambda field, q, limit: f"options:{field}:{q}:{limit}",
+)(get_distinct_values)
+
+_cached_totals = cached(
+    ttl=3600,
+    key_fn=lambda *a: "totals:" + "|".join(str(x) for x in a),
+)(compute_totals)
+
+# -------- progresso de import (compartilhado entre workers) --------
+# Hash no Redis por job_id: com vários workers, o poll de progresso pode
+# cair em outro processo que não o que está importando. Sem Redis, o
+# fallback em memória cobre o cenário de 1 processo (waitress + threads).
 
 def set_progress(job_id: str, stage: str, pct: int | None = None, message: str | None = None):
-    with IMPORT_LOCK:
-        cur = IMPORT_PROGRESS.get(job_id, {})
-        cur["stage"] = stage
-        if pct is not None:
-            cur["pct"] = int(max(0, min(100, pct)))
-        if message is not None:
-            cur["message"] = message
-        IMPORT_PROGRESS[job_id] = cur
+    progress_set(job_id, stage, pct, message)
+
+# Import roda fora do worker HTTP: 1 thread única serializa os jobs (dois
+# imports simultâneos corromperiam a carga) e o upload responde na hora.
+IMPORT_EXEC = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import")
+
+def _do_import(temp_path: str, job_id: str) -> None:
+    try:
+        def _cb(stage: str, pct: int, message: str | None = None):
+            set_progress(job_id, stage, pct, message)
+
+        imported_rows = import_csv_file(temp_path, progress_cb=_cb)
+        os.replace(temp_path, METRICS_CSV)
+        bump_data_version()  # invalida date-range/options/totais cacheados
+        set_progress(job_id, "done", 100, f"Importação concluída ({imported_rows} linhas)")
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        set_progress(job_id, "error", 0, f"Falha ao importar CSV: {e}")
 
 # ---------------- AUTH ----------------
 
+# Rotas de API que não exigem sessão autenticada
+PUBLIC_API = {"/api/login", "/api/me", "/api/logout"}
+
+@app.before_request
+def _load_user():
+    """Decodifica a sessão uma vez por request e popula g.user.
+
+    Evita que cada handler repita get_current_user(session) + checagem de
+    401; rotas fora de /api/ (frontend estático) passam direto.
+    """
+    if request.path.startswith("/api/") and request.path not in PUBLIC_API:
+        user = get_current_user(session)
+        if not user:
+            return jsonify({"error": "Não autenticado"}), 401
+        g.user = user
+
+def admin_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if g.user.get("role") != "admin":
+            return jsonify({"error": "Acesso negado (apenas admin)"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
 @app.route("/api/login", methods=["POST"])
 def login():
     data = request.get_json(force=True, silent=True) or {}
@@ -75,86 +173,105 @@ def logout():
 
 # ---------------- DATA ----------------
 
+def _decode_cursor(value: str):
+    """Cursor opaco (base64 de [valor_de_ordenação, rowid]) -> tupla."""
+    try:
+        pair = orjson.loads(base64.urlsafe_b64decode(value))
+        return (pair[0], int(pair[1]))
+    except Exception:
+        return None
+
+def _encode_cursor(pair) -> str | None:
+    if pair is None:
+        return None
+    return base64.urlsafe_b64encode(orjson.dumps(list(pair))).decode()
+
 @app.route("/api/data", methods=["GET"])
 def data():
-    user = get_current_user(session)
-    if not user:
-        return jsonify({"error": "Não autenticado"}), 401
-
     try:
-        date_from   = request.args.get("date_from")
-        date_to     = request.args.get("date_to")
-        account_id  = request.args.get("account_id")
-        campaign_id = request.args.get("campaign_id")
-        sort_by     = request.args.get("sort_by")
-        sort_dir    = request.args.get("sort_dir", "asc")
-        page        = int(request.args.get("page", 1))
-        page_size   = int(request.args.get("page_size", 50))
-        include_cost = (user.get("role") == "admin")
-
-        rows, total, totals = query_metrics_sql(
-            date_from=date_from, date_to=date_to,
-            account_id=account_id, campaign_id=campaign_id,
-            sort_by=sort_by, sort_dir=sort_dir,
-            page=page, page_size=page_size,
+        q = parse_data_query(request.args)
+        include_cost = (g.user.get("role") == "admin")
+
+        rows, total, totals, next_cursor = query_metrics_sql(
+            date_from=q.date_from, date_to=q.date_to,
+            account_id=q.account_id, campaign_id=q.campaign_id,
+            sort_by=q.sort_by, sort_dir=q.sort_dir,
+            page=q.page, page_size=q.page_size,
             include_cost=include_cost,
+            cursor=_decode_cursor(q.cursor) if q.cursor else None,
         )
 
-        return jsonify({
-            "rows": rows, "page": page, "page_size": page_size,
-            "total": int(total), "totals": totals
-        }), 200
-
-    except Exception as e:
-        import traceback; traceback.print_exc()
-        return jsonify({"error": f"{type(e).__name__}: {e}"}), 500
+        return ojson({
+            "rows": rows, "page": q.page, "page_size": q.page_size,
+            "total": int(total), "totals": totals,
+            "next_cursor": _encode_cursor(next_cursor),
+        })
+
+    except Exception:
+        # Detalhe fica no log do servidor; o cliente recebe um erro genérico
+        logger.exception("Erro em %s", request.path)
+        return jsonify({"error": "Erro interno"}), 500
+
+def _chunked_csv(gen, chunk_bytes: int = 65536):
+    """Agrupa os pedaços do gerador em blocos de ~64KB.
+
+    Um yield por linha gera milhares de writes minúsculos no socket; blocos
+    maiores mantêm memória O(chunk_bytes) e throughput alto mesmo em
+    exportações de milhões de linhas.
+    """
+    buf = StringIO()
+    for piece in gen:
+        buf.write(piece)
+        if buf.tell() >= chunk_bytes:
+            yield buf.getvalue()
+            buf.seek(0); buf.truncate(0)
+    tail = buf.getvalue()
+    if tail:
+        yield tail
 
 @app.route("/api/export", methods=["GET"])
 def export_csv():
-    user = get_current_user(session)
-    if not user:
-        return jsonify({"error": "Não autenticado"}), 401
-
-    date_from   = request.args.get("date_from")
-    date_to     = request.args.get("date_to")
-    account_id  = request.args.get("account_id")
-    campaign_id = request.args.get("campaign_id")
-    sort_by     = request.args.get("sort_by")
-    sort_dir    = request.args.get("sort_dir", "asc")
-    include_cost = (user.get("role") == "admin")
-
-    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-    df = (date_from or "all"); dt = (date_to or "all")
+    q = parse_data_query(request.args)
+    include_cost = (g.user.get("role") == "admin")
+
+    # Formatação direta de struct_time: evita o strftime (lookup de locale)
+    # a cada download no endpoint mais lento da API.
+    lt = time.localtime()
+    ts = (f"{lt.tm_year:04d}{lt.tm_mon:02d}{lt.tm_mday:02d}"
+          f"-{lt.tm_hour:02d}{lt.tm_min:02d}{lt.tm_sec:02d}")
+    df = (q.date_from or "all"); dt = (q.date_to or "all")
     filename = f"metrics_export_{df}_{dt}_{ts}.csv"
 
-    gen = stream_export_csv(date_from, date_to, account_id, campaign_id, sort_by, sort_dir, include_cost)
-    return Response(gen, mimetype="text/csv; charset=utf-8",
+    gen = stream_export_csv(q.date_from, q.date_to, q.account_id, q.campaign_id,
+                            q.sort_by, q.sort_dir, include_cost)
+    # direct_passthrough evita que o Flask/Compress consuma e bufferize o
+    # gerador inteiro antes de responder; o cliente recebe o primeiro bloco
+    # em milissegundos, independente do tamanho do resultado.
+    resp = Response(_chunked_csv(gen), mimetype="text/csv; charset=utf-8",
+                    direct_passthrough=True,
                     headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    resp.headers["Cache-Control"] = "no-store"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
 
 @app.route("/api/date-range", methods=["GET"])
+@with_etag
 def date_range():
-    return jsonify(get_date_bounds()), 200
+    return jsonify(_cached_date_bounds()), 200
 
 @app.route("/api/options", methods=["GET"])
+@with_etag
 def options():
-    user = get_current_user(session)
-    if not user:
-        return jsonify({"error": "Não autenticado"}), 401
-
     field = request.args.get("field", "")
     q     = request.args.get("q", "")
     limit = int(request.args.get("limit", 100))
-    vals = get_distinct_values(field, q, limit)
+    vals = _cached_options(field, q, limit)
     return jsonify({"values": vals}), 200
 
 # ---- comparação de períodos ----
 @app.route("/api/compare", methods=["GET"])
 def compare():
-    user = get_current_user(session)
-    if not user:
-        return jsonify({"error": "Não autenticado"}), 401
-
-    include_cost = (user.get("role") == "admin")
+    include_cost = (g.user.get("role") == "admin")
 
     a_from = request.args.get("date_from_a")
     a_to   = request.args.get("date_to_a")
@@ -164,56 +281,46 @@ def compare():
     campaign_id = request.args.get("campaign_id")
 
     try:
-        total_a = compute_totals(a_from, a_to, account_id, campaign_id, include_cost)
-        total_b = compute_totals(b_from, b_to, account_id, campaign_id, include_cost)
-
-        diff_abs = {}
-        diff_pct = {}
-        for k in total_a.keys():
-            da = float(total_a.get(k, 0.0))
-            db = float(total_b.get(k, 0.0))
-            diff_abs[k] = db - da
-            diff_pct[k] = None if da == 0 else ((db - da) / da) * 100.0
-
-        return jsonify({"total_a": total_a, "total_b": total_b,
-                        "diff_abs": diff_abs, "diff_pct": diff_pct}), 200
-    except Exception as e:
-        import traceback; traceback.print_exc()
-        return jsonify({"error": f"{type(e).__name__}: {e}"}), 500
+        total_a = _cached_totals(a_from, a_to, account_id, campaign_id, include_cost)
+        total_b = _cached_totals(b_from, b_to, account_id, campaign_id, include_cost)
+
+        # Diferenças vetorizadas: uma subtração/divisão NumPy sobre todas as
+        # métricas de uma vez, em vez de um loop Python chave a chave.
+        keys = list(total_a)
+        a = np.fromiter((total_a[k] for k in keys), dtype=np.float64, count=len(keys))
+        b = np.fromiter((total_b.get(k, 0.0) for k in keys), dtype=np.float64, count=len(keys))
+        delta = b - a
+        diff_abs = dict(zip(keys, delta.tolist()))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(a == 0, np.nan, delta / a * 100.0)
+        diff_pct = {k: (None if np.isnan(v) else v) for k, v in zip(keys, pct.tolist())}
+
+        return ojson({"total_a": total_a, "total_b": total_b,
+                      "diff_abs": diff_abs, "diff_pct": diff_pct})
+    except Exception:
+        # Detalhe fica no log do servidor; o cliente recebe um erro genérico
+        logger.exception("Erro em %s", request.path)
+        return jsonify({"error": "Erro interno"}), 500
 
 # ---------------- IMPORT (com progresso) ----------------
 
 @app.route("/api/import-start", methods=["POST"])
+@admin_required
 def import_start():
-    user = get_current_user(session)
-    if not user:
-        return jsonify({"error": "Não autenticado"}), 401
-    if user.get("role") != "admin":
-        return jsonify({"error": "Acesso negado (apenas admin)"}), 403
-
     job_id = uuid.uuid4().hex
     set_progress(job_id, "ready", 0, "Aguardando upload")
     return jsonify({"job_id": job_id}), 200
 
 @app.route("/api/import-progress", methods=["GET"])
 def import_progress():
-    user = get_current_user(session)
-    if not user:
-        return jsonify({"error": "Não autenticado"}), 401
     job_id = request.args.get("job_id")
     if not job_id:
         return jsonify({"error": "job_id é obrigatório"}), 400
-    with IMPORT_LOCK:
-        return jsonify(IMPORT_PROGRESS.get(job_id, {"stage": "unknown", "pct": 0})), 200
+    return jsonify(progress_get(job_id)), 200
 
 @app.route("/api/import", methods=["POST"])
+@admin_required
 def import_metrics():
-    user = get_current_user(session)
-    if not user:
-        return jsonify({"error": "Não autenticado"}), 401
-    if user.get("role") != "admin":
-        return jsonify({"error": "Acesso negado (apenas admin)"}), 403
-
     job_id = request.args.get("job_id") or request.form.get("job_id") or uuid.uuid4().hex
     set_progress(job_id, "uploading", 0, "Recebendo arquivo")
 
@@ -230,30 +337,60 @@ def import_metrics():
     os.makedirs(os.path.dirname(METRICS_CSV), exist_ok=True)
     temp_path = os.path.join(os.path.dirname(METRICS_CSV), f"__upload_{uuid.uuid4().hex}.csv")
 
-    f.save(temp_path)
-    set_progress(job_id, "importing", 0, "Importando CSV")
+    # Cópia em blocos de 1MB (vs 16KB do f.save), reportando progresso do
+    # upload; em arquivos de GBs isso reduz o nº de syscalls e dá feedback
+    # imediato na UI antes mesmo do import começar.
+    total_bytes = int(request.content_length or 0)
+    written = 0
+    buf_size = 1 << 20
+    with open(temp_path, "wb", buffering=buf_size) as out:
+        while True:
+            chunk = f.stream.read(buf_size)
+            if not chunk:
+                break
+            out.write(chunk)
+            written += len(chunk)
+            if total_bytes:
+                set_progress(job_id, "uploading", int(written * 100 / total_bytes))
 
-    try:
-        def _cb(stage: str, pct: int, message: str | None = None):
-            set_progress(job_id, stage, pct, message)
-
-        imported_rows = import_csv_file(temp_path, progress_cb=_cb)
-        os.replace(temp_path, METRICS_CSV)
-        set_progress(job_id, "finalizing", 100, "Finalizando")
-    except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        set_progress(job_id, "error", 0, str(e))
-        return jsonify({"error": f"Falha ao importar CSV: {e}"}), 400
+    set_progress(job_id, "importing", 0, "Importando CSV")
+    IMPORT_EXEC.submit(_do_import, temp_path, job_id)
 
-    set_progress(job_id, "done", 100, f"Importação concluída ({imported_rows} linhas)")
-    return jsonify({"ok": True, "message": f"Importação concluída ({imported_rows} linhas).", "job_id": job_id}), 200
+    # 202: import continua em background; o frontend já acompanha o job
+    # pelo polling de /api/import-progress.
+    return jsonify({"ok": True, "message": "Importação iniciada.", "job_id": job_id}), 202
 
 # ---------------- FRONT ----------------
 
+@app.after_request
+def _serve_precompressed(resp):
+    """Entrega o .gz pré-gerado dos assets estáticos, se existir.
+
+    Troca a compressão por request do Flask-Compress (que é mantida para o
+    JSON dinâmico de /api/*) por um arquivo comprimido uma única vez no
+    deploy via backend/precompress_static.py. Como o Content-Encoding já
+    vem preenchido, o Compress pula a resposta.
+    """
+    if request.path.startswith("/api/") or resp.status_code != 200:
+        return resp
+    if "gzip" not in (request.headers.get("Accept-Encoding") or "").lower():
+        return resp
+    if resp.headers.get("Content-Encoding"):
+        return resp
+    rel = request.path.lstrip("/") or "index.html"
+    gz_path = os.path.join(app.static_folder, rel + ".gz")
+    if os.path.isfile(gz_path):
+        with open(gz_path, "rb") as fh:
+            resp.set_data(fh.read())
+        resp.headers["Content-Encoding"] = "gzip"
+        resp.headers["Vary"] = "Accept-Encoding"
+    return resp
+
 @app.route("/")
 def index():
     return send_from_directory(app.static_folder, "index.html")
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000, debug=False)
+    # Atalho de conveniência: a configuração do servidor vive em serve.py
+    from serve import main
+    main()
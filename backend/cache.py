@@ -0,0 +1,163 @@
+# backend/cache.py
+# -----------------------------------------------------------------------------
+# Cache de leitura para os endpoints quentes:
+# - Redis quando disponível (REDIS_URL); fallback em memória no processo
+# - Chaves versionadas por DATA_VERSION: bump_data_version() após um import
+#   bem-sucedido invalida tudo de uma vez, sem varrer chaves
+# - Progresso de import em hash Redis: com N workers, o poll de
+#   /api/import-progress pode cair em outro processo que não o do upload
+# -----------------------------------------------------------------------------
+
+import json
+import os
+import time
+from functools import wraps
+from threading import Lock
+
+try:
+    import redis as _redis_lib
+except ImportError:
+    _redis_lib = None
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+VERSION_KEY = "metrics:version"
+
+# _client: None = ainda não tentou; False = indisponível (não tenta de novo)
+_client = None
+_fallback: dict = {}
+_fallback_version = 1
+_lock = Lock()
+
+# Teto do fallback em memória: as chaves de /api/options incluem o `q`
+# digitado, então sem limite o dict cresceria sem parar num deploy sem
+# Redis. Mesma estratégia do _COUNT_CACHE do data_loader: cap + clear.
+_FALLBACK_MAX = 1024
+
+
+def _redis():
+    global _client
+    if _client is None:
+        if _redis_lib is None:
+            _client = False
+        else:
+            try:
+                c = _redis_lib.Redis.from_url(
+                    REDIS_URL, decode_responses=True,
+                    socket_connect_timeout=0.5, socket_timeout=0.5,
+                )
+                c.ping()
+                _client = c
+            except Exception:
+                _client = False
+    return _client or None
+
+
+def data_version() -> int:
+    """Versão atual dos dados (incrementada a cada import)."""
+    r = _redis()
+    if r:
+        try:
+            return int(r.get(VERSION_KEY) or 1)
+        except Exception:
+            pass
+    return _fallback_version
+
+
+def bump_data_version() -> None:
+    """Invalida o cache inteiro mudando o prefixo de versão das chaves."""
+    global _fallback_version
+    r = _redis()
+    if r:
+        try:
+            r.incr(VERSION_KEY)
+            return
+        except Exception:
+            pass
+    with _lock:
+        _fallback_version += 1
+        _fallback.clear()
+
+
+# -------- progresso de import (hash por job) --------
+
+PROGRESS_TTL = 3600
+_progress: dict = {}
+
+
+def progress_set(job_id: str, stage: str, pct=None, message=None) -> None:
+    fields = {"stage": stage}
+    if pct is not None:
+        fields["pct"] = int(max(0, min(100, pct)))
+    if message is not None:
+        fields["message"] = message
+
+    r = _redis()
+    if r:
+        try:
+            key = f"import:{job_id}"
+            r.hset(key, mapping=fields)  # HSET é atômico, dispensa lock
+            r.expire(key, PROGRESS_TTL)
+            return
+        except Exception:
+            pass
+    with _lock:
+        cur = _progress.get(job_id, {})
+        cur.update(fields)
+        _progress[job_id] = cur
+
+
+def progress_get(job_id: str) -> dict:
+    r = _redis()
+    if r:
+        try:
+            data = r.hgetall(f"import:{job_id}")
+            if data:
+                if "pct" in data:
+                    data["pct"] = int(data["pct"])
+                return data
+            return {"stage": "unknown", "pct": 0}
+        except Exception:
+            pass
+    with _lock:
+        return dict(_progress.get(job_id, {"stage": "unknown", "pct": 0}))
+
+
+def cached(ttl: int, key_fn):
+    """Decora uma função de leitura com cache versionado.
+
+    key_fn(*args, **kwargs) -> str identifica a chamada; o resultado precisa
+    ser serializável em JSON (os endpoints retornam dict/list).
+    """
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = f"v{data_version()}:{key_fn(*args, **kwargs)}"
+            r = _redis()
+            if r:
+                try:
+                    hit = r.get(key)
+                    if hit is not None:
+                        return json.loads(hit)
+                    result = fn(*args, **kwargs)
+                    r.setex(key, ttl, json.dumps(result))
+                    return result
+                except Exception:
+                    pass  # Redis caiu no meio: serve sem cache
+            with _lock:
+                entry = _fallback.get(key)
+                if entry and entry[0] > time.monotonic():
+                    return entry[1]
+            result = fn(*args, **kwargs)
+            with _lock:
+                if len(_fallback) >= _FALLBACK_MAX:
+                    # primeiro tenta só expurgar o que já venceu
+                    now = time.monotonic()
+                    expired = [k for k, v in _fallback.items() if v[0] <= now]
+                    for k in expired:
+                        del _fallback[k]
+                    if len(_fallback) >= _FALLBACK_MAX:
+                        _fallback.clear()
+                _fallback[key] = (time.monotonic() + ttl, result)
+            return result
+        return wrapper
+    return deco
@@ -12,11 +12,25 @@
 
 import os
 import sqlite3
+import threading
+from functools import lru_cache
 import pandas as pd
 from typing import Optional, Tuple, List, Dict, Any, Iterator, Callable
 import csv
+import io
 from io import StringIO
 
+from utils import parse_date_safe
+
+# PyArrow é opcional: parsing de CSV multithreaded em C++ (3-10x o pandas);
+# sem ele, o caminho pandas abaixo continua funcionando igual.
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
 # === Caminhos base ===
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -25,33 +39,184 @@ USERS_CSV   = os.path.join(DATA_DIR, "users.csv")
 METRICS_CSV = os.path.join(DATA_DIR, "metrics.csv")
 DB_PATH     = os.path.join(DATA_DIR, "metrics.db")
 
+# Ordem canônica das colunas da tabela metrics (INSERTs do import)
+METRICS_COLUMNS = [
+    "account_id","campaign_id","cost_micros",
+    "clicks","conversions","impressions","interactions","date",
+]
+
 # Colunas permitidas para ORDER BY (sanitização)
 ALLOWED_SORT = {
     "account_id","campaign_id","cost_micros",
     "clicks","conversions","impressions","interactions","date",
 }
 
+# ----------- Conexões de leitura (cache por thread) -----------
+# Abrir sqlite3.connect() a cada request custa mais que a própria query nos
+# endpoints pequenos. Cada thread do servidor mantém uma conexão somente-
+# leitura com PRAGMAs afinados; _DB_GENERATION permite invalidar todas
+# quando o arquivo do banco for recriado.
+
+_tls = threading.local()
+_DB_GENERATION = 0
+
+def _read_conn() -> sqlite3.Connection:
+    conn = getattr(_tls, "conn", None)
+    if conn is None or getattr(_tls, "gen", -1) != _DB_GENERATION:
+        if conn is not None:
+            conn.close()
+        # cached_statements=512: o default (128) é apertado para a expansão
+        # de templates da paginação (8 colunas de sort x 2 direções x custo x
+        # modos) somada ao trio rows/count/totals — statements quentes se
+        # despejavam entre si e voltavam a ser recompilados.
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=512)
+        # sqlite3.Row: acesso por nome em C, sem zip(headers, row) por linha
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=1;")          # leitores nunca escrevem
+        conn.execute("PRAGMA mmap_size=1073741824;")  # páginas via mmap (1GB)
+        conn.execute("PRAGMA cache_size=-200000;")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        conn.execute("PRAGMA case_sensitive_like=ON;")  # habilita LIKE 'q%' via índice
+        _tls.conn = conn
+        _tls.gen = _DB_GENERATION
+    return conn
+
+def invalidate_read_conns() -> None:
+    """Força cada thread a reabrir sua conexão (ex.: troca do arquivo .db)."""
+    global _DB_GENERATION
+    _DB_GENERATION += 1
+
 # ----------- SCHEMA / BOOTSTRAP -----------
 
-def create_schema(conn: sqlite3.Connection) -> None:
-    cur = conn.cursor()
-    cur.execute("""
+METRICS_INDEXES = {
+    # Índice cobridor: a paginação default (ORDER BY date) vira um scan
+    # somente-índice, sem voltar à tabela para buscar as métricas
+    "idx_metrics_date_cover": (
+        "CREATE INDEX IF NOT EXISTS idx_metrics_date_cover ON metrics"
+        "(date, account_id, campaign_id, clicks, conversions, impressions, interactions, cost_micros);"
+    ),
+    "idx_metrics_acct": "CREATE INDEX IF NOT EXISTS idx_metrics_acct ON metrics(account_id);",
+    "idx_metrics_cmp":  "CREATE INDEX IF NOT EXISTS idx_metrics_cmp  ON metrics(campaign_id);",
+}
+
+def create_table(conn: sqlite3.Connection) -> None:
+    # date guarda dias desde 1970-01-01 (INTEGER): comparação/ordenação por
+    # inteiro em vez de collation de string, e ~1/3 dos bytes por célula.
+    # Contadores em INTEGER: varint de 1-9 bytes por célula (REAL são 8
+    # fixos) e SUM inteiro; só conversions é fracionária de verdade. A
+    # afinidade INTEGER converte sozinha floats exatos (5.0 -> 5) na escrita.
+    # account_id/campaign_id são FKs inteiras para as dimensões: os mesmos
+    # textos se repetiam milhões de vezes na tabela e em cada página de
+    # índice — como varint, a linha da fato encolhe várias vezes.
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS metrics (
-        account_id   TEXT,
-        campaign_id  TEXT,
-        cost_micros  REAL,
-        clicks       REAL,
+        account_id   INTEGER,
+        campaign_id  INTEGER,
+        cost_micros  INTEGER,
+        clicks       INTEGER,
         conversions  REAL,
-        impressions  REAL,
-        interactions REAL,
-        date         TEXT
+        impressions  INTEGER,
+        interactions INTEGER,
+        date         INTEGER
     );
     """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_metrics_date ON metrics(date);")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_metrics_acct ON metrics(account_id);")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_metrics_cmp  ON metrics(campaign_id);")
+
+def create_dimensions(conn: sqlite3.Connection) -> None:
+    # Dimensões de normalização: cada texto distinto vive uma única vez aqui
+    # (o UNIQUE cria o índice usado pelos filtros LIKE e pelo autocomplete)
+    conn.execute("CREATE TABLE IF NOT EXISTS accounts(id INTEGER PRIMARY KEY, account_id TEXT UNIQUE);")
+    conn.execute("CREATE TABLE IF NOT EXISTS campaigns(id INTEGER PRIMARY KEY, campaign_id TEXT UNIQUE);")
+
+def create_indexes(conn: sqlite3.Connection) -> None:
+    for ddl in METRICS_INDEXES.values():
+        conn.execute(ddl)
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    create_dimensions(conn)
+    create_table(conn)
+    create_indexes(conn)
     conn.commit()
 
+# ---------- autocomplete: dimensões como fonte de valores distintos ----------
+
+# As dimensões têm os distintos (milhares de linhas contra milhões na fato),
+# então o autocomplete fica independente do tamanho da base.
+_DISTINCT_TABLES = {
+    "account_id":  "accounts",
+    "campaign_id": "campaigns",
+}
+
+def _rebuild_options_fts(conn: sqlite3.Connection) -> None:
+    """Reconstrói a tabela FTS5 usada pelo autocomplete de /api/options.
+
+    Guarda só os valores DISTINTOS de account_id/campaign_id (milhares de
+    linhas, não milhões) com tokenizer trigram, permitindo busca por
+    substring via MATCH em vez de LIKE '%q%' com scan completo. Se o SQLite
+    local não tiver FTS5/trigram, segue sem a tabela (o fallback LIKE cobre).
+    """
+    try:
+        conn.execute("DROP TABLE IF EXISTS opts_fts;")
+        conn.execute(
+            "CREATE VIRTUAL TABLE opts_fts USING fts5(field UNINDEXED, value, tokenize='trigram');"
+        )
+        # As dimensões já têm só os distintos: popular o FTS a partir delas
+        # evita refazer o DISTINCT sobre a base inteira
+        conn.execute("""
+            INSERT INTO opts_fts(field, value)
+            SELECT 'account_id', account_id FROM accounts WHERE account_id IS NOT NULL
+            UNION ALL
+            SELECT 'campaign_id', campaign_id FROM campaigns WHERE campaign_id IS NOT NULL;
+        """)
+        conn.commit()
+    except sqlite3.OperationalError:
+        pass
+
+# ---------- rollup diário: totais em O(dias) em vez de O(linhas) ----------
+
+def _rebuild_rollup(conn: sqlite3.Connection) -> None:
+    """Reconstrói metrics_daily, o rollup usado pelas queries de totais.
+
+    Uma linha por (date, account_id, campaign_id) com as métricas somadas:
+    os filtros da API só tocam essas três colunas, então SUM no rollup dá o
+    mesmo resultado que SUM na tabela cheia lendo ordens de grandeza menos
+    linhas (o rodapé de /api/data roda esse SUM em toda requisição).
+    """
+    conn.execute("DROP TABLE IF EXISTS metrics_daily;")
+    conn.execute("""
+    CREATE TABLE metrics_daily (
+        date         INTEGER,
+        account_id   INTEGER,
+        campaign_id  INTEGER,
+        cost_micros  INTEGER,
+        clicks       INTEGER,
+        conversions  REAL,
+        impressions  INTEGER,
+        interactions INTEGER,
+        PRIMARY KEY (date, account_id, campaign_id)
+    );
+    """)
+    conn.execute("""
+        INSERT INTO metrics_daily
+        SELECT date, account_id, campaign_id,
+               SUM(cost_micros), SUM(clicks), SUM(conversions),
+               SUM(impressions), SUM(interactions)
+        FROM metrics
+        GROUP BY 1, 2, 3;
+    """)
+    conn.commit()
+
+# Existência do rollup, cacheada por geração do banco (bancos antigos podem
+# não ter a tabela até o ensure_db_ready/import reconstruir)
+_rollup_state: Tuple[int, bool] = (-1, False)
+
+def _totals_table(conn: sqlite3.Connection) -> str:
+    global _rollup_state
+    gen, ok = _rollup_state
+    if gen != _DB_GENERATION:
+        ok = table_exists(conn, "metrics_daily")
+        _rollup_state = (_DB_GENERATION, ok)
+    return "metrics_daily" if ok else "metrics"
+
 # ---------- util: contar linhas p/ estimar % ----------
 
 def count_csv_rows(csv_path: str) -> int:
@@ -63,6 +228,96 @@ def count_csv_rows(csv_path: str) -> int:
 
 # ----------- IMPORTAÇÃO EM CHUNKS (com progresso) -----------
 
+_ARROW_TYPES = None if pa is None else {
+    "account_id":   pa.string(),
+    "campaign_id":  pa.string(),
+    "cost_micros":  pa.float64(),
+    "clicks":       pa.float64(),
+    "conversions":  pa.float64(),
+    "impressions":  pa.float64(),
+    "interactions": pa.float64(),
+    "date":         pa.date32(),
+}
+
+# Colunas inteiras na tabela: lidas como float64 (CSV pode trazer "5.0") e
+# arredondadas para int64 antes do INSERT — bindar int evita o float boxing
+# e casa com a afinidade INTEGER do schema
+_INT_COLUMNS = {"cost_micros", "clicks", "impressions", "interactions"}
+
+def _iter_csv_batches_arrow(csv_path: str) -> Iterator[Tuple[List[str], List[tuple]]]:
+    reader = pacsv.open_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(block_size=64 << 20),
+        convert_options=pacsv.ConvertOptions(column_types=_ARROW_TYPES),
+    )
+    for batch in reader:
+        cols = [c for c in METRICS_COLUMNS if c in batch.schema.names]
+        arrays = []
+        for name in cols:
+            col = batch.column(batch.schema.get_field_index(name))
+            if name == "date":
+                # date32 já é dias-desde-epoch; só reinterpretamos como int32
+                col = col.cast(pa.int32())
+            elif name in _INT_COLUMNS:
+                col = pc.round(col).cast(pa.int64(), safe=False)
+            arrays.append(col.to_pylist())
+        yield cols, list(zip(*arrays))
+
+def _iter_csv_batches_pandas(csv_path: str, read_chunksize: int) -> Iterator[Tuple[List[str], List[tuple]]]:
+    for chunk in pd.read_csv(
+        csv_path,
+        dtype={"account_id": str, "campaign_id": str},
+        chunksize=read_chunksize,
+        low_memory=False
+    ):
+        for col in ["cost_micros","clicks","conversions","impressions","interactions"]:
+            if col in chunk.columns:
+                chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+        # Mesma normalização do caminho Arrow: contadores arredondados para
+        # int antes do bind, senão floats não exatos passariam pela afinidade
+        # INTEGER e ficariam armazenados como REAL
+        for col in _INT_COLUMNS:
+            if col in chunk.columns:
+                rounded = chunk[col].round()
+                chunk[col] = [None if pd.isna(v) else int(v) for v in rounded]
+        days = (pd.to_datetime(chunk["date"], errors="coerce") - pd.Timestamp("1970-01-01")).dt.days
+        chunk["date"] = [None if pd.isna(v) else int(v) for v in days]
+        cols = [c for c in METRICS_COLUMNS if c in chunk.columns]
+        yield cols, list(chunk[cols].itertuples(index=False, name=None))
+
+def _iter_csv_batches(csv_path: str, read_chunksize: int) -> Iterator[Tuple[List[str], List[tuple]]]:
+    """Itera o CSV em lotes normalizados (cols, linhas) prontos p/ INSERT."""
+    if pa is not None:
+        yield from _iter_csv_batches_arrow(csv_path)
+    else:
+        yield from _iter_csv_batches_pandas(csv_path, read_chunksize)
+
+# Tabelas de dimensão por coluna de texto da fato
+_DIM_TABLES = {"account_id": "accounts", "campaign_id": "campaigns"}
+
+def _normalize_dims(conn: sqlite3.Connection, cols: List[str], rows: list, maps: Dict[str, dict]) -> list:
+    """Troca os textos de account/campaign pelos ids das dimensões.
+
+    Textos ainda não vistos entram via INSERT OR IGNORE e o mapa em memória
+    é recarregado (dimensões têm milhares de linhas, é barato); o comum é o
+    lote inteiro resolver por lookup de dict.
+    """
+    rows = [list(r) for r in rows]
+    for col, table in _DIM_TABLES.items():
+        if col not in cols:
+            continue
+        i = cols.index(col)
+        cache = maps[col]
+        new = {r[i] for r in rows} - cache.keys() - {None}
+        if new:
+            conn.executemany(f"INSERT OR IGNORE INTO {table}({col}) VALUES (?);",
+                             [(v,) for v in new])
+            for rid, text in conn.execute(f"SELECT id, {col} FROM {table};"):
+                cache[text] = rid
+        for r in rows:
+            r[i] = cache.get(r[i])
+    return rows
+
 def import_csv_chunks(
     conn: sqlite3.Connection,
     csv_path: str,
@@ -73,51 +328,251 @@ def import_csv_chunks(
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV não encontrado: {csv_path}")
 
-    conn.execute("DELETE FROM metrics;")
-    conn.commit()
-
     total = 0
     imported = 0
+    dim_maps: Dict[str, dict] = {col: {} for col in _DIM_TABLES}
 
-    for chunk in pd.read_csv(
-        csv_path,
-        dtype={"account_id": str, "campaign_id": str},
-        chunksize=read_chunksize,
-        low_memory=False
-    ):
-        for col in ["cost_micros","clicks","conversions","impressions","interactions"]:
-            if col in chunk.columns:
-                chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
-        chunk["date"] = pd.to_datetime(chunk["date"], errors="coerce").dt.strftime("%Y-%m-%d")
-
-        SQLITE_MAX_VARS = 999
-        n_cols = len(chunk.columns)
-        rows_per_insert = max(1, (SQLITE_MAX_VARS // n_cols) - 1)
-
-        chunk.to_sql(
-            "metrics",
-            conn,
-            if_exists="append",
-            index=False,
-            method="multi",
-            chunksize=rows_per_insert
-        )
+    # Uma transação única para a carga toda: sem ela, cada lote vira um
+    # COMMIT + fsync próprio, que domina o tempo de import em SSD.
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        # DROP TABLE libera as páginas em O(1) (DELETE andaria linha a linha
+        # escrevendo journal) e leva os índices junto — os INSERTs abaixo
+        # atualizam 1 btree em vez de 4; índices voltam no _finalize_import.
+        # As dimensões também zeram, senão ids de cargas antigas sobram.
+        for table in ("metrics", "accounts", "campaigns"):
+            conn.execute(f"DROP TABLE IF EXISTS {table};")
+        create_dimensions(conn)
+        create_table(conn)
+
+        for cols, rows in _iter_csv_batches(csv_path, read_chunksize):
+            rows = _normalize_dims(conn, cols, rows, dim_maps)
+            # executemany reusa um único statement preparado; não há limite de
+            # 999 variáveis por linha como no INSERT multi-VALUES do to_sql.
+            sql = f"INSERT INTO metrics({','.join(cols)}) VALUES ({','.join('?' * len(cols))});"
+            conn.executemany(sql, rows)
+
+            imported += len(rows)
+            total    += len(rows)
 
-        imported += len(chunk)
-        total    += len(chunk)
+            if progress_cb and total_rows and total_rows > 0:
+                pct = min(99, int(imported / total_rows * 100))
+                progress_cb("importing", pct, f"{imported}/{total_rows}")
 
-        if progress_cb and total_rows and total_rows > 0:
-            pct = min(99, int(imported / total_rows * 100))
-            progress_cb("importing", pct, f"{imported}/{total_rows}")
+        conn.execute("COMMIT;")
+    except Exception:
+        conn.execute("ROLLBACK;")
+        raise
 
+    _finalize_import(conn)
+
+    if progress_cb:
+        progress_cb("importing", 100, "done")
+
+    return total
+
+def _finalize_import(conn: sqlite3.Connection) -> None:
+    """Pós-carga comum aos imports serial e paralelo."""
+    create_indexes(conn)
+    _rebuild_options_fts(conn)
+    _rebuild_rollup(conn)
+    _COUNT_CACHE.clear()  # os totais filtrados mudaram com a nova carga
     conn.execute("ANALYZE;")
-    conn.commit()
+    # A tabela foi recriada do zero: cada thread leitora reabre sua conexão
+    # (o bump de geração também re-checa a existência do rollup)
+    invalidate_read_conns()
+
+# ----------- IMPORTAÇÃO PARALELA (multiprocessing + ATTACH) -----------
+# Para CSVs grandes, o parse domina o tempo de carga e roda num core só.
+# O arquivo é fatiado em N faixas de bytes alinhadas em '\n'; cada processo
+# importa a sua faixa num part_i.db próprio (executemany, sem índices) e o
+# coordenador funde tudo com ATTACH + INSERT...SELECT, que copia linhas em C
+# sem reparse. Abaixo do limiar, o overhead de subir processos não paga.
+
+_PARALLEL_MIN_BYTES = 256 << 20  # 256MB
+
+def _import_workers() -> int:
+    """Nº de processos de import: IMPORT_WORKERS no env, senão nº de CPUs."""
+    try:
+        n = int(os.environ.get("IMPORT_WORKERS", "0"))
+    except ValueError:
+        n = 0
+    return n if n > 0 else min(8, os.cpu_count() or 1)
+
+def _split_csv_ranges(csv_path: str, n: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """Divide o CSV (após o cabeçalho) em até n faixas alinhadas em '\\n'."""
+    size = os.path.getsize(csv_path)
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        bounds = [start]
+        for i in range(1, n):
+            target = start + (size - start) * i // n
+            if target <= bounds[-1]:
+                continue
+            f.seek(target)
+            f.readline()              # avança até o fim da linha corrente
+            pos = f.tell()
+            if pos > bounds[-1] and pos < size:
+                bounds.append(pos)
+        bounds.append(size)
+    ranges = [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+    return header, ranges
+
+class _CsvSlice(io.RawIOBase):
+    """File-like que entrega o cabeçalho + uma faixa [start, end) do CSV."""
+    def __init__(self, path: str, start: int, end: int, header: bytes):
+        self._f = open(path, "rb")
+        self._f.seek(start)
+        self._left = end - start
+        self._header = header
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self._header:
+            n = min(len(b), len(self._header))
+            b[:n] = self._header[:n]
+            self._header = self._header[n:]
+            return n
+        if self._left <= 0:
+            return 0
+        n = self._f.readinto(memoryview(b)[:min(len(b), self._left)])
+        self._left -= n
+        return n
+
+    def close(self) -> None:
+        self._f.close()
+        super().close()
+
+def _create_staging(conn: sqlite3.Connection) -> None:
+    # Staging dos workers: account/campaign ainda em TEXT — a troca pelos
+    # ids das dimensões acontece no merge, onde o mapa é único
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS metrics (
+        account_id   TEXT,
+        campaign_id  TEXT,
+        cost_micros  INTEGER,
+        clicks       INTEGER,
+        conversions  REAL,
+        impressions  INTEGER,
+        interactions INTEGER,
+        date         INTEGER
+    );
+    """)
+
+def _import_slice(csv_path: str, start: int, end: int, header: bytes, part_path: str) -> int:
+    """Worker (roda em outro processo): importa uma faixa num part_i.db."""
+    conn = sqlite3.connect(part_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=OFF;")   # part db é descartável
+    conn.execute("PRAGMA synchronous=OFF;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    try:
+        _create_staging(conn)                  # sem índices: só INSERT
+        total = 0
+        src = io.BufferedReader(_CsvSlice(csv_path, start, end, header), 1 << 20)
+        conn.execute("BEGIN;")
+        for cols, rows in _iter_csv_batches(src, 200_000):
+            sql = f"INSERT INTO metrics({','.join(cols)}) VALUES ({','.join('?' * len(cols))});"
+            conn.executemany(sql, rows)
+            total += len(rows)
+        conn.execute("COMMIT;")
+        return total
+    finally:
+        conn.close()
+
+def import_csv_parallel(
+    conn: sqlite3.Connection,
+    csv_path: str,
+    total_rows: Optional[int] = None,
+    progress_cb: Optional[Callable[[str, int, Optional[str]], None]] = None,
+) -> int:
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    workers = _import_workers()
+    header, ranges = _split_csv_ranges(csv_path, workers)
+    if len(ranges) <= 1:
+        return import_csv_chunks(conn, csv_path, total_rows=total_rows, progress_cb=progress_cb)
+
+    part_paths = [os.path.join(DATA_DIR, f"part_{i}.db") for i in range(len(ranges))]
+    for p in part_paths:
+        if os.path.exists(p):
+            os.remove(p)
+
+    total = 0
+    try:
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = {
+                pool.submit(_import_slice, csv_path, a, b, header, p): p
+                for (a, b), p in zip(ranges, part_paths)
+            }
+            done = 0
+            for fut in as_completed(futures):
+                total += fut.result()   # propaga exceção do worker
+                done += 1
+                if progress_cb and total_rows and total_rows > 0:
+                    # o parse é ~metade do trabalho; o merge reporta o resto
+                    pct = min(50, int(done / len(ranges) * 50))
+                    progress_cb("importing", pct, f"{total}/{total_rows}")
+
+        # Merge: ATTACH não roda dentro de transação, então a limpeza e cada
+        # INSERT...SELECT commitam separados (falha no meio = reimport).
+        # DROP TABLE em vez de DELETE: O(1) e leva os índices junto.
+        for table in ("metrics", "accounts", "campaigns"):
+            conn.execute(f"DROP TABLE IF EXISTS {table};")
+        create_dimensions(conn)
+        create_table(conn)
+        merged = 0
+        for i, p in enumerate(part_paths):
+            conn.execute(f"ATTACH DATABASE ? AS p_{i};", (p,))
+            # Normalização no merge: os distintos da fatia entram nas
+            # dimensões e o INSERT...SELECT troca texto por id via join
+            conn.execute(f"INSERT OR IGNORE INTO accounts(account_id) "
+                         f"SELECT DISTINCT account_id FROM p_{i}.metrics WHERE account_id IS NOT NULL;")
+            conn.execute(f"INSERT OR IGNORE INTO campaigns(campaign_id) "
+                         f"SELECT DISTINCT campaign_id FROM p_{i}.metrics WHERE campaign_id IS NOT NULL;")
+            conn.execute(f"""
+                INSERT INTO metrics(account_id, campaign_id, cost_micros, clicks,
+                                    conversions, impressions, interactions, date)
+                SELECT a.id, c.id, m.cost_micros, m.clicks,
+                       m.conversions, m.impressions, m.interactions, m.date
+                FROM p_{i}.metrics m
+                LEFT JOIN accounts  a ON a.account_id  = m.account_id
+                LEFT JOIN campaigns c ON c.campaign_id = m.campaign_id;
+            """)
+            conn.commit()
+            conn.execute(f"DETACH DATABASE p_{i};")
+            merged += 1
+            if progress_cb and total_rows and total_rows > 0:
+                pct = 50 + min(49, int(merged / len(part_paths) * 50))
+                progress_cb("importing", pct, f"{total}/{total_rows}")
+    finally:
+        for p in part_paths:
+            if os.path.exists(p):
+                os.remove(p)
+
+    _finalize_import(conn)
 
     if progress_cb:
         progress_cb("importing", 100, "done")
 
     return total
 
+def _open_write_conn() -> sqlite3.Connection:
+    """Conexão de escrita com PRAGMAs afinados para carga em lote.
+
+    WAL + synchronous=NORMAL tiram o fsync por transação do caminho crítico;
+    cache/temp em memória evitam spill em ANALYZE e criação de índices.
+    """
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-262144;")     # 256MB de page cache
+    conn.execute("PRAGMA mmap_size=268435456;")    # leituras da carga via mmap
+    return conn
+
 def import_csv_file(
     csv_path: str,
     progress_cb: Optional[Callable[[str, int, Optional[str]], None]] = None
@@ -125,9 +580,11 @@ def import_csv_file(
     os.makedirs(DATA_DIR, exist_ok=True)
     total_rows = count_csv_rows(csv_path)
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = _open_write_conn()
     try:
         create_schema(conn)
+        if os.path.getsize(csv_path) >= _PARALLEL_MIN_BYTES and _import_workers() > 1:
+            return import_csv_parallel(conn, csv_path, total_rows=total_rows, progress_cb=progress_cb)
         return import_csv_chunks(conn, csv_path, total_rows=total_rows, progress_cb=progress_cb)
     finally:
         conn.close()
@@ -136,57 +593,192 @@ def table_exists(conn: sqlite3.Connection, name: str) -> bool:
     cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?;", (name,))
     return cur.fetchone() is not None
 
+# Bootstrap/migração rodam uma vez por processo: depois do primeiro sucesso,
+# ensure_db_ready é só um teste de bool no caminho quente (antes, toda query
+# abria uma conexão de escrita e contava a tabela).
+_ready = False
+_ready_lock = threading.Lock()
+
 def ensure_db_ready() -> None:
+    global _ready
+    if _ready:
+        return
+    with _ready_lock:
+        if _ready:
+            return
+        _bootstrap_db()
+        _ready = True
+
+def _bootstrap_db() -> None:
     os.makedirs(DATA_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = _open_write_conn()
     try:
+        # Migração: bancos criados antes da troca de date TEXT -> INTEGER,
+        # dos contadores REAL -> INTEGER ou da normalização das dimensões
+        # são reconstruídos a partir do CSV
+        cur = conn.execute(
+            "SELECT name, type FROM pragma_table_info('metrics') "
+            "WHERE name IN ('date', 'clicks', 'account_id');"
+        )
+        types = {name: str(t).upper() for name, t in cur.fetchall()}
+        if (types.get("date") == "TEXT" or types.get("clicks") == "REAL"
+                or types.get("account_id") == "TEXT"):
+            # As derivadas caem junto: se o CSV não existir para reimportar,
+            # rollup/FTS/dimensões órfãos serviriam totais e autocomplete de
+            # uma base que não existe mais
+            for table in ("metrics", "metrics_daily", "opts_fts", "accounts", "campaigns"):
+                conn.execute(f"DROP TABLE IF EXISTS {table};")
+        # tabelas de distintos da versão pré-dimensões
+        conn.execute("DROP TABLE IF EXISTS metrics_accounts;")
+        conn.execute("DROP TABLE IF EXISTS metrics_campaigns;")
+
         create_schema(conn)
-        cur = conn.execute("SELECT COUNT(*) FROM metrics;")
-        (count,) = cur.fetchone()
-        if count == 0 and os.path.exists(METRICS_CSV):
+        # Só interessa "está vazia?": SELECT 1 LIMIT 1 para na primeira
+        # linha, sem o passeio de páginas do COUNT(*)
+        empty = conn.execute("SELECT 1 FROM metrics LIMIT 1;").fetchone() is None
+        if empty and os.path.exists(METRICS_CSV):
             import_csv_chunks(conn, METRICS_CSV)
+        elif not empty and not table_exists(conn, "metrics_daily"):
+            # Migração: banco carregado antes do rollup de totais existir
+            _rebuild_rollup(conn)
     finally:
         conn.close()
 
 # ----------- USUÁRIOS -----------
 
-def load_users() -> Dict[str, Dict[str, str]]:
-    if not os.path.exists(USERS_CSV):
-        return {}
-    df = pd.read_csv(USERS_CSV, dtype=str).fillna("")
+@lru_cache(maxsize=1)
+def _load_users_cached(mtime: float) -> Dict[str, Dict[str, str]]:
+    # csv.DictReader basta para um arquivo de dezenas de linhas: lê em
+    # microssegundos, sem pagar o parser/alocação de DataFrame do pandas
     users: Dict[str, Dict[str, str]] = {}
-    for _, row in df.iterrows():
-        key = (row.get("username") or row.get("email") or "").strip()
-        if not key:
-            continue
-        users[key] = {
-            "password": str(row.get("password") or ""),
-            "role":     str(row.get("role") or "user"),
-        }
+    with open(USERS_CSV, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            key = (row.get("username") or row.get("email") or "").strip()
+            if not key:
+                continue
+            users[key] = {
+                "password": str(row.get("password") or ""),
+                "role":     str(row.get("role") or "user"),
+            }
     return users
 
+def load_users() -> Dict[str, Dict[str, str]]:
+    # Memoizado pelo mtime: cada checagem de auth reusava o parse inteiro;
+    # editar o users.csv invalida sozinho (o mtime muda a chave do cache)
+    try:
+        mtime = os.stat(USERS_CSV).st_mtime
+    except OSError:
+        return {}
+    return _load_users_cached(mtime)
+
 # ----------- WHERE dinâmico -----------
 
-def _build_where(date_from, date_to, account_id, campaign_id):
+from datetime import date as _date
+
+_EPOCH = _date(1970, 1, 1)
+
+# Converte a coluna INTEGER (dias) de volta para "YYYY-MM-DD" na saída
+DATE_AS_ISO = "date(date * 86400, 'unixepoch') AS date"
+
+def _date_to_days(value) -> Optional[int]:
+    """'YYYY-MM-DD' -> dias desde epoch (None se inválida)."""
+    d = parse_date_safe(value)
+    return None if d is None else (d - _EPOCH).days
+
+@lru_cache(maxsize=None)  # 16 combinações x prefixo
+def _where_clause(has_df: bool, has_dt: bool, has_acct: bool, has_cmp: bool,
+                  prefix: str = "") -> str:
+    # `prefix` qualifica as colunas da fato ("metrics.") nas queries com
+    # join às dimensões; vazio serve para metrics_daily e para o COUNT.
     where = []
+    if has_df:
+        where.append(f"{prefix}date >= ?")
+    if has_dt:
+        where.append(f"{prefix}date <= ?")
+    # Filtro por prefixo (q%) resolvido na dimensão: o LIKE varre milhares
+    # de distintos (range scan no índice UNIQUE, com case_sensitive_like
+    # ligado) e a fato filtra pelos ids inteiros resultantes.
+    if has_acct:
+        where.append(f"{prefix}account_id IN (SELECT id FROM accounts WHERE account_id LIKE ?)")
+    if has_cmp:
+        where.append(f"{prefix}campaign_id IN (SELECT id FROM campaigns WHERE campaign_id LIKE ?)")
+    return f"WHERE {' AND '.join(where)}" if where else ""
+
+def _build_where(date_from, date_to, account_id, campaign_id, prefix: str = ""):
     params: List[Any] = []
-    if date_from:
-        where.append("date >= ?")
-        params.append(date_from)
-    if date_to:
-        where.append("date <= ?")
-        params.append(date_to)
+    df = _date_to_days(date_from) if date_from else None
+    dt = _date_to_days(date_to) if date_to else None
+    if df is not None:
+        params.append(df)
+    if dt is not None:
+        params.append(dt)
     if account_id:
-        where.append("account_id LIKE ?")
-        params.append(f"%{account_id}%")
+        params.append(f"{account_id}%")
     if campaign_id:
-        where.append("campaign_id LIKE ?")
-        params.append(f"%{campaign_id}%")
-    where_clause = f"WHERE {' AND '.join(where)}" if where else ""
+        params.append(f"{campaign_id}%")
+    where_clause = _where_clause(df is not None, dt is not None,
+                                 bool(account_id), bool(campaign_id), prefix)
     return where_clause, params
 
 # ----------- Consulta paginada + totais -----------
 
+# Cache do COUNT filtrado: o total de um mesmo filtro não muda entre imports,
+# então páginas seguintes reutilizam o valor e a query da página pode parar no
+# LIMIT (sem COUNT(*) OVER(), que materializa o resultado inteiro). Filtros
+# pequenos nem entram — o COUNT deles já é barato.
+_COUNT_CACHE: Dict[tuple, int] = {}
+_COUNT_CACHE_MAX = 1024
+_COUNT_CACHE_MIN_ROWS = 10_000
+
+# SQL renderizado é função pura dos flags (filtros presentes, sort, modo):
+# memoizar garante que requisições iguais enviem o MESMO texto de SQL, então
+# o cache interno de statements do sqlite3 reaproveita o prepared statement
+# em vez de recompilar, e a montagem de f-strings sai do caminho quente.
+
+# Join padrão fato -> dimensões para devolver os textos originais; LEFT para
+# não derrubar linhas com id nulo
+_DIM_JOINS = ("FROM metrics "
+              "LEFT JOIN accounts a ON a.id = metrics.account_id "
+              "LEFT JOIN campaigns c ON c.id = metrics.campaign_id")
+
+# Ordenar por account/campaign deve seguir o texto da dimensão, não a FK
+_SORT_EXPR = {"account_id": "a.account_id", "campaign_id": "c.campaign_id"}
+
+@lru_cache(maxsize=256)
+def _render_page_sql(include_cost: bool, where_clause: str, sort_by: str,
+                     sort_dir: str, use_window: bool, use_cursor: bool) -> str:
+    cols = ("a.account_id AS account_id, c.campaign_id AS campaign_id, "
+            + ("cost_micros, " if include_cost else "")
+            + f"clicks, conversions, impressions, interactions, {DATE_AS_ISO}")
+    total_col = ", COUNT(*) OVER () AS _total" if use_window else ""
+    key = _SORT_EXPR.get(sort_by, f"metrics.{sort_by}")
+    # _k/_rid expõem o valor cru de ordenação + rowid para montar o cursor
+    # da próxima página (o date formatado não serve para o seek).
+    key_cols = f", {key} AS _k, metrics.rowid AS _rid"
+    if use_cursor:
+        op = "<" if sort_dir == "DESC" else ">"
+        seek = f"({key}, metrics.rowid) {op} (?, ?)"
+        seek_clause = f"{where_clause} AND {seek}" if where_clause else f"WHERE {seek}"
+        return (
+            f"SELECT {cols}{key_cols}{total_col} {_DIM_JOINS} {seek_clause} "
+            f"ORDER BY {key} {sort_dir}, metrics.rowid {sort_dir} LIMIT ?;"
+        )
+    return (
+        f"SELECT {cols}{key_cols}{total_col} {_DIM_JOINS} {where_clause} "
+        f"ORDER BY {key} {sort_dir}, metrics.rowid {sort_dir} LIMIT ? OFFSET ?;"
+    )
+
+@lru_cache(maxsize=64)
+def _render_totals_sql(include_cost: bool, where_clause: str, table: str) -> str:
+    # `table` é metrics_daily quando o rollup existe: os filtros (date/
+    # account/campaign, inclusive LIKE de prefixo) só tocam as colunas de
+    # agrupamento, então o SUM dá o mesmo resultado lendo bem menos linhas.
+    sums = ("COALESCE(SUM(clicks),0), COALESCE(SUM(conversions),0), "
+            "COALESCE(SUM(impressions),0), COALESCE(SUM(interactions),0)")
+    if include_cost:
+        sums += ", COALESCE(SUM(cost_micros),0)"
+    return f"SELECT {sums} FROM {table} {where_clause};"
+
 def query_metrics_sql(
     date_from: Optional[str],
     date_to: Optional[str],
@@ -197,7 +789,15 @@ def query_metrics_sql(
     page: int,
     page_size: int,
     include_cost: bool,
-) -> Tuple[List[Dict[str, Any]], int, Dict[str, float]]:
+    cursor: Optional[Tuple[Any, int]] = None,
+) -> Tuple[List[Dict[str, Any]], int, Dict[str, float], Optional[Tuple[Any, int]]]:
+    """Página filtrada + total + totais + cursor da próxima página.
+
+    `cursor` é o par (valor_de_ordenação, rowid) da última linha da página
+    anterior: a busca vira um seek O(page_size) no índice, em vez do OFFSET
+    que lê e descarta todas as linhas anteriores (página 10.000 = 500k
+    linhas relidas para devolver 50).
+    """
     ensure_db_ready()
 
     sort_by  = sort_by if sort_by in ALLOWED_SORT else "date"
@@ -213,146 +813,203 @@ def query_metrics_sql(
 
     offset = (page - 1) * page_size
 
-    cols = "account_id, campaign_id, clicks, conversions, impressions, interactions, date"
-    if include_cost:
-        cols = "account_id, campaign_id, cost_micros, clicks, conversions, impressions, interactions, date"
-
+    # Clause sem prefixo serve a count/totais (sem join); a da página
+    # qualifica as colunas da fato por causa do join com as dimensões
     where_clause, params = _build_where(date_from, date_to, account_id, campaign_id)
+    page_where, _ = _build_where(date_from, date_to, account_id, campaign_id, "metrics.")
+
+    # COUNT(*) OVER () devolve o total filtrado junto com a página: um único
+    # scan do índice em vez de rodar a mesma query duas vezes (rows + count).
+    # Com o total em cache, a query dispensa a janela e para no LIMIT.
+    count_key = (date_from, date_to, account_id, campaign_id)
+    cached_total = _COUNT_CACHE.get(count_key)
 
+    # A janela de COUNT só entra no modo OFFSET: com cursor ela contaria
+    # apenas as linhas após o seek, não o total do filtro.
+    use_window = cached_total is None and cursor is None
     sql_count = f"SELECT COUNT(*) FROM metrics {where_clause};"
-    sql_rows  = f"""
-        SELECT {cols}
-        FROM metrics
-        {where_clause}
-        ORDER BY {sort_by} {sort_dir}
-        LIMIT ? OFFSET ?;
-    """
 
-    if include_cost:
-        sql_totals = f"""
-            SELECT
-              COALESCE(SUM(clicks),0),
-              COALESCE(SUM(conversions),0),
-              COALESCE(SUM(impressions),0),
-              COALESCE(SUM(interactions),0),
-              COALESCE(SUM(cost_micros),0)
-            FROM metrics
-            {where_clause};
-        """
+    sql_rows = _render_page_sql(include_cost, page_where, sort_by, sort_dir,
+                                use_window, cursor is not None)
+    if cursor is not None:
+        page_params = params + [cursor[0], cursor[1], page_size]
     else:
-        sql_totals = f"""
-            SELECT
-              COALESCE(SUM(clicks),0),
-              COALESCE(SUM(conversions),0),
-              COALESCE(SUM(impressions),0),
-              COALESCE(SUM(interactions),0)
-            FROM metrics
-            {where_clause};
-        """
-
-    conn = sqlite3.connect(DB_PATH)
-    try:
+        page_params = params + [page_size, offset]
+
+    conn = _read_conn()
+    sql_totals = _render_totals_sql(include_cost, where_clause, _totals_table(conn))
+
+    cur = conn.execute(sql_rows, page_params)
+    rows = [dict(r) for r in cur.fetchall()]
+
+    next_cursor = None
+    if len(rows) == page_size:
+        next_cursor = (rows[-1]["_k"], rows[-1]["_rid"])
+
+    if cached_total is not None:
+        total = cached_total
+    elif use_window and rows:
+        total = rows[0]["_total"]
+        if total >= _COUNT_CACHE_MIN_ROWS:
+            if len(_COUNT_CACHE) >= _COUNT_CACHE_MAX:
+                _COUNT_CACHE.clear()
+            _COUNT_CACHE[count_key] = total
+    else:
+        # Modo cursor sem cache, página além do fim ou filtro vazio
         cur = conn.execute(sql_count, params)
         (total,) = cur.fetchone()
 
-        cur = conn.execute(sql_rows, params + [page_size, offset])
-        headers = [c[0] for c in cur.description]
-        rows = [dict(zip(headers, r)) for r in cur.fetchall()]
-
-        cur = conn.execute(sql_totals, params)
-        if include_cost:
-            clicks, conv, impr, inter, cost = cur.fetchone()
-            totals = {
-                "clicks": float(clicks or 0.0),
-                "conversions": float(conv or 0.0),
-                "impressions": float(impr or 0.0),
-                "interactions": float(inter or 0.0),
-                "cost_micros": float(cost or 0.0),
-            }
-        else:
-            clicks, conv, impr, inter = cur.fetchone()
-            totals = {
-                "clicks": float(clicks or 0.0),
-                "conversions": float(conv or 0.0),
-                "impressions": float(impr or 0.0),
-                "interactions": float(inter or 0.0),
-            }
-    finally:
-        conn.close()
+    for r in rows:
+        r.pop("_total", None)
+        r.pop("_k", None)
+        r.pop("_rid", None)
+
+    cur = conn.execute(sql_totals, params)
+    if include_cost:
+        clicks, conv, impr, inter, cost = cur.fetchone()
+        totals = {
+            "clicks": float(clicks or 0.0),
+            "conversions": float(conv or 0.0),
+            "impressions": float(impr or 0.0),
+            "interactions": float(inter or 0.0),
+            "cost_micros": float(cost or 0.0),
+        }
+    else:
+        clicks, conv, impr, inter = cur.fetchone()
+        totals = {
+            "clicks": float(clicks or 0.0),
+            "conversions": float(conv or 0.0),
+            "impressions": float(impr or 0.0),
+            "interactions": float(inter or 0.0),
+        }
 
-    return rows, int(total), totals
+    return rows, int(total), totals, next_cursor
 
 # ----------- Export streaming -----------
 
+@lru_cache(maxsize=256)
+def _render_export_sql(include_cost: bool, where_clause: str, sort_by: str, sort_dir: str) -> str:
+    cols = ("a.account_id AS account_id, c.campaign_id AS campaign_id, "
+            + ("cost_micros, " if include_cost else "")
+            + f"clicks, conversions, impressions, interactions, {DATE_AS_ISO}")
+    key = _SORT_EXPR.get(sort_by, f"metrics.{sort_by}")
+    return f"SELECT {cols} {_DIM_JOINS} {where_clause} ORDER BY {key} {sort_dir};"
+
 def _build_export_sql(date_from, date_to, account_id, campaign_id, sort_by, sort_dir, include_cost):
     sort_by  = sort_by if sort_by in ALLOWED_SORT else "date"
     sort_dir = "DESC" if str(sort_dir or "").lower() == "desc" else "ASC"
-
-    cols = "account_id, campaign_id, clicks, conversions, impressions, interactions, date"
-    if include_cost:
-        cols = "account_id, campaign_id, cost_micros, clicks, conversions, impressions, interactions, date"
-
-    where_clause, params = _build_where(date_from, date_to, account_id, campaign_id)
-    sql = f"""
-        SELECT {cols}
-        FROM metrics
-        {where_clause}
-        ORDER BY {sort_by} {sort_dir};
-    """
+    where_clause, params = _build_where(date_from, date_to, account_id, campaign_id, "metrics.")
+    sql = _render_export_sql(include_cost, where_clause, sort_by, sort_dir)
     return sql, params
 
+def _format_csv_arrow(headers: List[str], batch: list) -> str:
+    """Formata um lote de linhas em CSV via pyarrow (quoting/serialização em C++)."""
+    arrays = [pa.array([row[i] for row in batch]) for i in range(len(headers))]
+    rb = pa.record_batch(arrays, names=headers)
+    sink = io.BytesIO()
+    pacsv.write_csv(rb, sink, pacsv.WriteOptions(include_header=False))
+    return sink.getvalue().decode("utf-8")
+
 def stream_export_csv(date_from, date_to, account_id, campaign_id, sort_by, sort_dir, include_cost) -> Iterator[str]:
     ensure_db_ready()
     sql, params = _build_export_sql(date_from, date_to, account_id, campaign_id, sort_by, sort_dir, include_cost)
 
-    conn = sqlite3.connect(DB_PATH)
+    # Usa a conexão cacheada da thread (o gerador é consumido pela mesma
+    # thread do worker); só o cursor é descartado no fim.
+    cur = _read_conn().cursor()
     try:
-        cur = conn.execute(sql, params)
+        # arraysize = tamanho do lote de emissão: fetchmany() sem argumento
+        # usa esse valor, então buffer de fetch e lote não divergem
+        cur.arraysize = 50_000 if pa is not None else 10_000
+        cur.execute(sql, params)
         headers = [c[0] for c in cur.description]
 
+        # O writer do Arrow termina linhas com \n; o header precisa casar,
+        # senão o arquivo mistura \r\n e \n conforme o caminho usado
         buf = StringIO()
-        writer = csv.writer(buf)
-        writer.writerow(headers)
+        csv.writer(buf, lineterminator="\n" if pa is not None else "\r\n").writerow(headers)
         yield buf.getvalue()
-        buf.seek(0); buf.truncate(0)
-
-        for row in cur:
-            writer.writerow(row)
-            out = buf.getvalue()
-            if out:
-                yield out
-                buf.seek(0); buf.truncate(0)
+
+        if pa is not None:
+            # Caminho rápido: o writer CSV do Arrow formata cada lote em C++
+            # (decisões de quoting fora do Python); só o header sai pelo
+            # csv.writer (o writer do Arrow quota todo campo texto)
+            while True:
+                batch = cur.fetchmany()
+                if not batch:
+                    break
+                yield _format_csv_arrow(headers, batch)
+            return
+
+        # Lotes de 10k linhas: writerows roda o laço em C e cada lote usa um
+        # StringIO novo (memória limitada pelo lote, sem churn de truncate)
+        while True:
+            batch = cur.fetchmany()
+            if not batch:
+                break
+            buf = StringIO()
+            csv.writer(buf).writerows(batch)
+            yield buf.getvalue()
     finally:
-        conn.close()
+        cur.close()
 
 # ----------- Bounds & Autocomplete -----------
 
+@lru_cache(maxsize=1)
+def _date_bounds_cached(gen: int) -> Tuple[Optional[str], Optional[str]]:
+    # MIN e MAX em statements separados: cada um vira um seek O(1) nas
+    # pontas do índice de date (juntos num SELECT só, versões antigas do
+    # SQLite desistem da otimização e varrem)
+    conn = _read_conn()
+    (lo,) = conn.execute("SELECT date(MIN(date) * 86400, 'unixepoch') FROM metrics;").fetchone()
+    (hi,) = conn.execute("SELECT date(MAX(date) * 86400, 'unixepoch') FROM metrics;").fetchone()
+    return lo, hi
+
 def get_date_bounds() -> Dict[str, Optional[str]]:
+    # Memoizado pela geração do banco: só muda quando um import invalida as
+    # conexões, e a UI pede os bounds em todo carregamento de página
     ensure_db_ready()
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        cur = conn.execute("SELECT MIN(date), MAX(date) FROM metrics;")
-        row = cur.fetchone() or (None, None)
-        return {"min": row[0], "max": row[1]}
-    finally:
-        conn.close()
+    lo, hi = _date_bounds_cached(_DB_GENERATION)
+    return {"min": lo, "max": hi}
 
 def get_distinct_values(column: str, q: str = "", limit: int = 100) -> List[str]:
     ensure_db_ready()
     if column not in ("account_id", "campaign_id"):
         return []
+
+    # Caminho rápido: MATCH na tabela FTS5 de distintos (trigram exige >= 3
+    # caracteres). Se a tabela não existir neste banco, cai no LIKE abaixo.
+    if len(q) >= 3:
+        try:
+            cur = _read_conn().execute(
+                "SELECT value FROM opts_fts WHERE field = ? AND value MATCH ? "
+                "ORDER BY value LIMIT ?;",
+                (column, '"{}"'.format(q.replace('"', '""')), int(limit)),
+            )
+            return [row[0] for row in cur.fetchall()]
+        except sqlite3.OperationalError:
+            pass
+
     where = ""; params: List[Any] = []
     if q:
         where = f"WHERE {column} LIKE ?"
         params.append(f"%{q}%")
-    sql = f"SELECT DISTINCT {column} FROM metrics {where} ORDER BY {column} LIMIT ?;"
     params.append(int(limit))
-    conn = sqlite3.connect(DB_PATH)
+
+    # Tabela de distintos materializada no import: milhares de linhas já
+    # ordenadas pelo PK, custo independente do tamanho da base
+    table = _DISTINCT_TABLES[column]
     try:
-        cur = conn.execute(sql, params)
+        cur = _read_conn().execute(
+            f"SELECT {column} FROM {table} {where} ORDER BY {column} LIMIT ?;", params
+        )
+        return [row[0] for row in cur.fetchall()]
+    except sqlite3.OperationalError:
+        # banco antigo sem a tabela: DISTINCT direto na base
+        cur = _read_conn().execute(
+            f"SELECT DISTINCT {column} FROM metrics {where} ORDER BY {column} LIMIT ?;", params
+        )
         return [row[0] for row in cur.fetchall() if row and row[0] is not None]
-    finally:
-        conn.close()
 
 # ----------- Totais para comparação -----------
 
@@ -366,48 +1023,24 @@ def compute_totals(
     ensure_db_ready()
     where_clause, params = _build_where(date_from, date_to, account_id, campaign_id)
 
+    conn = _read_conn()
+    sql = _render_totals_sql(include_cost, where_clause, _totals_table(conn))
+    cur = conn.execute(sql, params)
+    row = cur.fetchone()
     if include_cost:
-        sql = f"""
-            SELECT
-              COALESCE(SUM(clicks),0),
-              COALESCE(SUM(conversions),0),
-              COALESCE(SUM(impressions),0),
-              COALESCE(SUM(interactions),0),
-              COALESCE(SUM(cost_micros),0)
-            FROM metrics
-            {where_clause};
-        """
+        clicks, conv, impr, inter, cost = row
+        return {
+            "clicks": float(clicks or 0.0),
+            "conversions": float(conv or 0.0),
+            "impressions": float(impr or 0.0),
+            "interactions": float(inter or 0.0),
+            "cost_micros": float(cost or 0.0),
+        }
     else:
-        sql = f"""
-            SELECT
-              COALESCE(SUM(clicks),0),
-              COALESCE(SUM(conversions),0),
-              COALESCE(SUM(impressions),0),
-              COALESCE(SUM(interactions),0)
-            FROM metrics
-            {where_clause};
-        """
-
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        cur = conn.execute(sql, params)
-        row = cur.fetchone()
-        if include_cost:
-            clicks, conv, impr, inter, cost = row
-            return {
-                "clicks": float(clicks or 0.0),
-                "conversions": float(conv or 0.0),
-                "impressions": float(impr or 0.0),
-                "interactions": float(inter or 0.0),
-                "cost_micros": float(cost or 0.0),
-            }
-        else:
-            clicks, conv, impr, inter = row
-            return {
-                "clicks": float(clicks or 0.0),
-                "conversions": float(conv or 0.0),
-                "impressions": float(impr or 0.0),
-                "interactions": float(inter or 0.0),
-            }
-    finally:
-        conn.close()
+        clicks, conv, impr, inter = row
+        return {
+            "clicks": float(clicks or 0.0),
+            "conversions": float(conv or 0.0),
+            "impressions": float(impr or 0.0),
+            "interactions": float(inter or 0.0),
+        }
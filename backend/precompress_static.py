@@ -0,0 +1,31 @@
+# backend/precompress_static.py
+# Gera os irmãos .gz dos assets do frontend (js/css/html) uma vez, no deploy.
+# O servidor então entrega o arquivo já comprimido (Content-Encoding: gzip)
+# sem gastar CPU comprimindo a cada request. Rode após alterar o frontend:
+#   python backend/precompress_static.py
+import gzip
+import shutil
+from pathlib import Path
+
+FRONTEND_DIR = Path(__file__).resolve().parents[1] / "frontend"
+EXTENSIONS = {".js", ".css", ".html"}
+
+def precompress(directory: Path = FRONTEND_DIR) -> int:
+    count = 0
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or path.suffix not in EXTENSIONS:
+            continue
+        gz_path = path.with_name(path.name + ".gz")
+        with open(path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=9) as dst:
+            shutil.copyfileobj(src, dst)
+        print(f"{path.name} -> {gz_path.name} "
+              f"({path.stat().st_size} -> {gz_path.stat().st_size} bytes)")
+        count += 1
+    return count
+
+def main():
+    n = precompress()
+    print(f"OK! {n} arquivo(s) comprimido(s).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# backend/serve.py
+# Entrada de produção: waitress com pool de threads dimensionado (2*CPU+1)
+# e keep-alive amigável a proxies reversos. Rode com:
+#   python backend/serve.py
+# Atrás de nginx, habilite `proxy_http_version 1.1;` e
+# `proxy_set_header Connection "";` para o keep-alive chegar até aqui.
+import os
+
+from waitress import serve
+
+from app import app
+
+def main():
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = int(os.environ.get("PORT", 8000))
+    threads = int(os.environ.get("WEB_THREADS", (os.cpu_count() or 1) * 2 + 1))
+    serve(
+        app,
+        host=host,
+        port=port,
+        threads=threads,
+        channel_timeout=30,       # derruba conexões keep-alive ociosas
+        connection_limit=1000,
+        asyncore_use_poll=True,   # poll() escala melhor que select() com muitas conexões
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,54 @@
-# backend/utils.py : se eu quiser usar depois em usar em melhorias, tipo paginação/export etc.)
-from datetime import datetime
+# backend/utils.py : helpers compartilhados (parsing de datas e de query string)
+from dataclasses import dataclass
+from datetime import date
 
 def parse_date_safe(value):
+    """'YYYY-MM-DD' -> date, ou None.
+
+    Checagem de formato antes do parse: valor inválido retorna None sem
+    levantar/capturar exceção (centenas de ns por chamada, e isso roda em
+    todo binding de filtro).
+    """
+    if not isinstance(value, str) or len(value) != 10 or value[4] != "-" or value[7] != "-":
+        return None
     try:
-        return datetime.fromisoformat(value).date()
-    except Exception:
+        return date(int(value[:4]), int(value[5:7]), int(value[8:10]))
+    except ValueError:
         return None
+
+@dataclass(slots=True)
+class DataQuery:
+    """Parâmetros de filtro/paginação de /api/data e /api/export."""
+    date_from: str | None = None
+    date_to: str | None = None
+    account_id: str | None = None
+    campaign_id: str | None = None
+    sort_by: str | None = None
+    sort_dir: str = "asc"
+    page: int = 1
+    page_size: int = 50
+    cursor: str | None = None  # cursor opaco de paginação keyset
+
+def _to_int(value, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def parse_data_query(args) -> DataQuery:
+    """Converte request.args em um DataQuery tipado, uma única vez.
+
+    Centraliza os gets + conversões de int que cada handler repetia; valores
+    inválidos caem no default em vez de estourar 500.
+    """
+    return DataQuery(
+        date_from=args.get("date_from"),
+        date_to=args.get("date_to"),
+        account_id=args.get("account_id"),
+        campaign_id=args.get("campaign_id"),
+        sort_by=args.get("sort_by"),
+        sort_dir=args.get("sort_dir", "asc"),
+        page=_to_int(args.get("page"), 1),
+        page_size=_to_int(args.get("page_size"), 50),
+        cursor=args.get("cursor"),
+    )
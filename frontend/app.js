@@ -268,36 +268,44 @@ fileInput?.addEventListener("change", async (e)=>{
     };
 
     // 3) poll do backend para progresso de import
+    // O backend responde 202 e importa em background: o polling é quem
+    // detecta o fim do job e recarrega a tabela.
     let pollTimer = setInterval(async ()=>{
       try {
         const r = await fetch(`/api/import-progress?job_id=${job_id}`, { credentials:"include" });
         if (!r.ok) return;
         const s = await r.json();
-        if (s.stage === "importing")       showImportProgress("Importando CSV…", s.pct ?? 0);
+        if (s.stage === "uploading")       showImportProgress("Enviando arquivo…", s.pct ?? 0);
+        else if (s.stage === "importing")  showImportProgress("Importando CSV…", s.pct ?? 0);
         else if (s.stage === "finalizing") showImportProgress("Finalizando…", 100);
-        else if (s.stage === "done")       showImportProgress("Concluído", 100);
-        else if (s.stage === "error")      showImportProgress("Erro na importação", 0);
-      } catch {}
-    }, 500);
-
-    xhr.onload = async () => {
-      clearInterval(pollTimer);
-      try {
-        const resp = JSON.parse(xhr.responseText || "{}");
-        if (xhr.status >= 200 && xhr.status < 300) {
+        else if (s.stage === "done") {
+          clearInterval(pollTimer);
+          showImportProgress("Concluído", 100);
           await preloadDates();
           await loadTable();
           hideImportProgress();
-          toast(resp.message || "Arquivo importado com sucesso.");
-        } else {
+          toast(s.message || "Arquivo importado com sucesso.");
+          e.target.value = "";
+        }
+        else if (s.stage === "error") {
+          clearInterval(pollTimer);
           hideImportProgress();
-          alert(resp.error || "Falha ao importar CSV.");
+          alert(s.message || "Falha ao importar CSV.");
+          e.target.value = "";
         }
-      } catch {
+      } catch {}
+    }, 500);
+
+    xhr.onload = () => {
+      if (xhr.status < 200 || xhr.status >= 300) {
+        clearInterval(pollTimer);
         hideImportProgress();
-        if (xhr.status < 200 || xhr.status >= 300) alert("Falha ao importar CSV.");
+        let resp = {};
+        try { resp = JSON.parse(xhr.responseText || "{}"); } catch {}
+        alert(resp.error || "Falha ao importar CSV.");
+        e.target.value = "";
       }
-      e.target.value = "";
+      // 2xx: import segue em background; o poll acima finaliza o fluxo.
     };
 
     xhr.onerror = () => {